@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+ALERT_COLUMNS = ["tipo", "serie", "FechaHora", "Hora", "valor", "baseline", "zscore", "caida_pct", "motivo"]
+
+# Mínimo de horas previas para calcular un baseline
+MIN_PERIODS = 3
+
+
+def time_column(registrations_df, tgs_affiliations_df) -> str:
+    """
+    Elige el eje de tiempo de las series.
+
+    'FechaHora' (fecha + hora, ver parse_multiple_files) si todos los datos la
+    tienen. Si no, 'Hora', que es solo la hora del día (0-23): en ese caso
+    archivos de días distintos con la misma hora se suman y el orden 0..23 no
+    respeta el paso por medianoche, así que solo sirve para datos de un día.
+    """
+    for df in [registrations_df, tgs_affiliations_df]:
+        if df.empty:
+            continue
+        if "FechaHora" not in df.columns or df["FechaHora"].isna().any():
+            return "Hora"
+    return "FechaHora"
+
+
+def build_series_matrix(df, series_col, time_col="Hora", value_col=None) -> pd.DataFrame:
+    """
+    Construye una matriz (series x horas) a partir de un DataFrame largo.
+
+    Si value_col es None se cuentan las filas (ej: registros por Hora y sitio),
+    si no se suma esa columna (ej: aff_count por Hora y grupo). Las horas en
+    que una serie no aparece quedan en 0, lo que permite detectar un sitio
+    que se quedó sin radios.
+    """
+    if df.empty or series_col not in df.columns or time_col not in df.columns:
+        return pd.DataFrame()
+
+    data = df.dropna(subset=[series_col, time_col])
+    # sort=False: 'sitio' puede mezclar nombres (str) con IDs sin mapear (int)
+    grouped = data.groupby([series_col, time_col], sort=False)
+    if value_col is None:
+        counts = grouped.size()
+    else:
+        counts = grouped[value_col].sum()
+    return counts.unstack(time_col, fill_value=0).sort_index(axis=1)
+
+
+def rolling_baseline(values: np.ndarray, window: int):
+    """
+    Calcula, para todas las series a la vez, la media y desviación estándar
+    de los `window` puntos anteriores a cada hora (sin incluir la actual).
+
+    Usa sumas acumuladas sobre el eje de tiempo, así que no hay loops por
+    serie. Retorna (media, std, cantidad_de_puntos_en_ventana).
+    """
+    n_series, n_times = values.shape
+    zeros = np.zeros((n_series, 1))
+    csum = np.concatenate([zeros, np.cumsum(values, axis=1)], axis=1)
+    csq = np.concatenate([zeros, np.cumsum(values ** 2, axis=1)], axis=1)
+
+    t = np.arange(n_times)
+    start = np.maximum(t - window, 0)
+    count = t - start
+
+    sums = csum[:, t] - csum[:, start]
+    sqs = csq[:, t] - csq[:, start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = sums / count
+        var = sqs / count - mean ** 2
+    std = np.sqrt(np.clip(var, 0, None))
+    return mean, std, count
+
+
+def detect_matrix_anomalies(matrix, tipo, window=12, min_periods=MIN_PERIODS, z_threshold=4.0,
+                            drop_threshold=0.5, min_baseline=5, time_col="Hora") -> pd.DataFrame:
+    """
+    Marca las caídas en una matriz (series x horas) comparando cada hora con
+    su baseline móvil. Una hora se marca si:
+    - z-score <= -z_threshold, o
+    - la caída porcentual respecto del baseline es >= drop_threshold,
+    siempre que haya al menos min_periods horas previas (como máximo window)
+    y el baseline sea >= min_baseline (para no alertar sobre series casi vacías).
+    """
+    if matrix.empty:
+        return pd.DataFrame(columns=ALERT_COLUMNS)
+
+    # La ventana nunca tiene más de `window` puntos
+    min_periods = min(min_periods, window)
+
+    values = matrix.to_numpy(dtype=float)
+    mean, std, count = rolling_baseline(values, window)
+
+    # Piso tipo Poisson para la desviación: con un baseline constante (std=0)
+    # cualquier variación mínima daría un z-score infinito.
+    std_floor = np.maximum(std, np.sqrt(np.maximum(np.nan_to_num(mean), 1.0)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        zscore = (values - mean) / std_floor
+        drop = (mean - values) / mean
+
+    valid = (count >= min_periods) & (np.nan_to_num(mean) >= min_baseline)
+    flag_z = valid & (zscore <= -z_threshold)
+    flag_drop = valid & (drop >= drop_threshold)
+    rows, cols = np.nonzero(flag_z | flag_drop)
+
+    motivo = np.where(
+        flag_z[rows, cols] & flag_drop[rows, cols], "zscore+caida",
+        np.where(flag_z[rows, cols], "zscore", "caida")
+    )
+    return pd.DataFrame({
+        "tipo": tipo,
+        "serie": matrix.index[rows],
+        time_col: matrix.columns[cols],
+        "valor": values[rows, cols],
+        "baseline": mean[rows, cols].round(2),
+        "zscore": zscore[rows, cols].round(2),
+        "caida_pct": (drop[rows, cols] * 100).round(1),
+        "motivo": motivo,
+    }, columns=ALERT_COLUMNS)
+
+
+def detect_anomalies(registrations_df, tgs_affiliations_df, excluded_sites=(28, 29, 30),
+                     time_col=None, **params) -> pd.DataFrame:
+    """
+    Ejecuta la detección sobre las tres familias de series:
+    - 'sitio': registros por hora y sitio, excluyendo excluded_sites (misma
+      base que el gráfico 1).
+    - 'grupo': registros por hora y grupo (misma base que el gráfico 2).
+    - 'afiliacion': suma de aff_count por hora y grupo (tgs_affiliations_df).
+
+    time_col es el eje de tiempo; si es None se elige con time_column. Los
+    parámetros extra se pasan a detect_matrix_anomalies. Retorna un DataFrame
+    con una fila por alerta, ordenado por tiempo (más reciente primero).
+    """
+    if time_col is None:
+        time_col = time_column(registrations_df, tgs_affiliations_df)
+    params["time_col"] = time_col
+    alerts = []
+
+    if not registrations_df.empty and "sitio" in registrations_df.columns:
+        regs_sites = registrations_df[~registrations_df["sitio"].isin(excluded_sites)]
+        matrix = build_series_matrix(regs_sites, "sitio", time_col=time_col)
+        alerts.append(detect_matrix_anomalies(matrix, "sitio", **params))
+
+    group_frames = [
+        ("grupo", registrations_df, None),
+        ("afiliacion", tgs_affiliations_df, "aff_count"),
+    ]
+    for tipo, df, value_col in group_frames:
+        if df.empty or "grupo_num" not in df.columns:
+            continue
+        matrix = build_series_matrix(df, "grupo_num", time_col=time_col, value_col=value_col)
+        df_alerts = detect_matrix_anomalies(matrix, tipo, **params)
+        # Mostramos el nombre del grupo en vez del número
+        labels = df.dropna(subset=["grupo_num"]).drop_duplicates("grupo_num").set_index("grupo_num")["grupo"]
+        df_alerts["serie"] = df_alerts["serie"].map(labels).fillna(df_alerts["serie"])
+        alerts.append(df_alerts)
+
+    alerts = [a for a in alerts if not a.empty]
+    if not alerts:
+        return pd.DataFrame(columns=ALERT_COLUMNS)
+
+    result = pd.concat(alerts, ignore_index=True)
+    result["serie"] = result["serie"].astype(str)
+    if time_col == "FechaHora":
+        result["Hora"] = result["FechaHora"].dt.hour
+    else:
+        result["FechaHora"] = pd.NaT
+    result = result.sort_values([time_col, "caida_pct"], ascending=[False, False], ignore_index=True)
+    return result[ALERT_COLUMNS]
@@ -10,6 +10,7 @@ import random
 import io  # Import necesario para manejar el archivo Excel
 
 from parser import parse_multiple_files
+from anomalies import detect_anomalies, time_column, MIN_PERIODS
 
 # Diccionario original para invertirlo y así recuperar IDs numéricos
 GRUPO_MAP = {
@@ -87,6 +88,7 @@ def main():
     1. Copia el código obtenido del proceso de diagnóstico de la url [http://10.7.50.1/log/diagnostics.txt](http://10.7.50.1/log/diagnostics.txt).
     2. Guarda el contenido copiado en un archivo `.txt`.
     3. Nombra el archivo con la hora correspondiente. Por ejemplo, si generaste el diagnóstico a las 10:55, el archivo debe llamarse `11.txt`.
+       Si vas a subir archivos de varios días, antepón la fecha: `2026-10-19_11.txt`.
 
     Se generan visualizaciones:
 
@@ -95,6 +97,7 @@ def main():
     3. Evolución del uptime Hora
     4. Topología Vista de Red Interactiva
     5. Radios registradas activas vs inactivas
+    6. Alertas de anomalías (caídas de radios por sitio, por grupo y de afiliaciones por TG)
     """)
 
     uploaded_files = st.file_uploader(
@@ -109,6 +112,16 @@ def main():
         registrations_df = data_dict["registrations_df"]
         tgs_affiliations_df = data_dict["tgs_affiliations_df"]
 
+        # Eje de tiempo de los gráficos y alertas: fecha + hora si todos los archivos la traen
+        time_col = time_column(registrations_df, tgs_affiliations_df)
+        time_label = "Fecha y Hora" if time_col == "FechaHora" else "Hora"
+        if time_col == "Hora" and len(uploaded_files) > 1:
+            st.warning("""
+            Los archivos no incluyen la fecha (ej. `2026-10-19_11.txt`), así que solo se usa la
+            hora del día (0-23). Archivos de días distintos con la misma hora se suman y no se
+            respeta el paso por medianoche: sube solo archivos de un mismo día o agrega la fecha.
+            """)
+
         # --------------------------
         # 1. Cantidad de Dispositivos por Sitio y Hora
         st.header("1. Cantidad de Dispositivos por Sitio y Hora")
@@ -122,16 +135,16 @@ def main():
                 # Omitir los sitios 28, 29 y 30
                 regs_site_filtered = registrations_df[~registrations_df["sitio"].isin([28, 29, 30])].copy()
 
-                df_counts = regs_site_filtered.groupby(["Hora", "sitio"]).size().reset_index(name="count")
+                df_counts = regs_site_filtered.groupby([time_col, "sitio"]).size().reset_index(name="count")
                 fig1 = px.bar(
                     df_counts,
-                    x='Hora',
+                    x=time_col,
                     y='count',
                     color='sitio',
                     barmode='group',
                     text='count',
                     labels={
-                        'Hora': 'Hora',
+                        time_col: time_label,
                         'count': 'Cantidad de Registros',
                         'sitio': 'Sitio'
                     },
@@ -182,23 +195,23 @@ def main():
 
                     st.subheader(f"{label} por Hora")
 
-                    # Agrupamos por (Hora, grupo)
+                    # Agrupamos por (Hora o FechaHora, grupo)
                     df_gcount = (
                         df_range
-                        .groupby(["Hora", "grupo"])
+                        .groupby([time_col, "grupo"])
                         .size()
                         .reset_index(name="count")
                     )
 
                     fig2 = px.bar(
                         df_gcount,
-                        x="Hora",
+                        x=time_col,
                         y="count",
                         color="grupo",  # Usamos el nombre del grupo
                         barmode="group",
                         text="count",
                         labels={
-                            "Hora": "Hora",
+                            time_col: time_label,
                             "count": "Cantidad de Registros",
                             "grupo": "Grupo"
                         },
@@ -225,14 +238,15 @@ def main():
                 active_regs = registrations_df[registrations_df["active"] == "true"]
                 df_hour = (
                     active_regs
-                    .groupby("Hora")
+                    .groupby(time_col)
                     .size()
                     .reset_index(name="count_active")
                 )
                 fig3 = px.line(
                     df_hour,
-                    x="Hora",
+                    x=time_col,
                     y="count_active",
+                    labels={time_col: time_label},
                     markers=True,
                     title="Evolución de registros activos Hora"
                 )
@@ -359,6 +373,48 @@ def main():
         else:
             st.info("No hay datos de registros dinámicos en los archivos subidos.")
 
+        # --------------------------
+        # 6. Alertas de anomalías
+        st.header("6. Alertas de anomalías")
+        st.write("""
+        Se compara cada hora con el promedio de las horas anteriores (baseline móvil) para
+        cada sitio, cada grupo y las afiliaciones (aff_count) de cada TG. Se alerta cuando
+        la cantidad cae bajo el baseline según el z-score o el porcentaje de caída.
+        Las series de sitio y de grupo usan los mismos conteos de los gráficos 1 y 2.
+        """)
+
+        with st.expander("Parámetros de detección"):
+            # Con solo la hora del día hay como máximo 24 puntos; con fecha, hasta una semana
+            max_window = 23 if time_col == "Hora" else 168
+            window = st.slider("Horas en el baseline", min_value=MIN_PERIODS, max_value=max_window, value=12)
+            z_threshold = st.slider("Umbral z-score (caída)", min_value=1.0, max_value=10.0, value=4.0, step=0.5)
+            drop_pct = st.slider("Umbral de caída (%)", min_value=10, max_value=100, value=50, step=5)
+            min_baseline = st.number_input("Baseline mínimo para alertar", min_value=0, value=5)
+
+        alerts_df = detect_anomalies(
+            registrations_df,
+            tgs_affiliations_df,
+            time_col=time_col,
+            window=window,
+            z_threshold=z_threshold,
+            drop_threshold=drop_pct / 100,
+            min_baseline=min_baseline
+        )
+
+        if not alerts_df.empty:
+            st.error(f"Se detectaron {len(alerts_df)} alertas.")
+            st.dataframe(alerts_df, use_container_width=True)
+
+            # Salida en formato JSON para integrarla con otros sistemas
+            st.download_button(
+                label="📥 Descargar alertas (JSON)",
+                data=alerts_df.to_json(orient="records", date_format="iso", force_ascii=False),
+                file_name="Alertas_Diagnostico.json",
+                mime="application/json"
+            )
+        else:
+            st.success("No se detectaron anomalías con los parámetros actuales.")
+
         # --------------------------
         # Botón para Descargar el Archivo Excel
         st.header("Descargar Datos")
@@ -367,11 +423,14 @@ def main():
         """)
 
         if not registrations_df.empty:
-            # Seleccionar las columnas Sitio, Grupo, Hora
-            download_df = registrations_df[['sitio', 'grupo', 'Hora']].copy()
+            # Seleccionar las columnas Sitio, Grupo, Hora (y FechaHora si los archivos traen fecha)
+            download_columns = ['sitio', 'grupo', 'Hora']
+            if time_col == "FechaHora":
+                download_columns.append('FechaHora')
+            download_df = registrations_df[download_columns].copy()
 
             # Renombrar columnas para mayor claridad
-            download_df.rename(columns={'sitio': 'Sitio', 'grupo': 'Grupo', 'Hora': 'Hora'}, inplace=True)
+            download_df.rename(columns={'sitio': 'Sitio', 'grupo': 'Grupo', 'Hora': 'Hora', 'FechaHora': 'Fecha y Hora'}, inplace=True)
 
             # Crear un buffer para el archivo Excel
             buffer = io.BytesIO()
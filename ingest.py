@@ -0,0 +1,239 @@
+import argparse
+import asyncio
+import datetime
+import hashlib
+import http.client
+import os
+import re
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from parser import parse_diagnostic_file, combine_parsed_files
+
+# URL de diagnóstico por defecto (la misma que se indica en app.py)
+DEFAULT_URL = "http://10.7.50.1/log/diagnostics.txt"
+
+
+def snapshot_time(when: datetime.datetime) -> datetime.datetime:
+    """
+    Calcula la fecha y hora asociadas a un diagnóstico, con el mismo criterio
+    usado para nombrar los archivos a mano: se redondea a la hora más cercana
+    (ej: 10:55 => 11:00, 10:20 => 10:00, 23:40 => 00:00 del día siguiente).
+    """
+    rounded = when + datetime.timedelta(minutes=30)
+    return rounded.replace(minute=0, second=0, microsecond=0)
+
+
+def fetch_diagnostic(url: str, timeout: float) -> bytes:
+    """
+    Descarga (de forma bloqueante) el contenido de diagnóstico de un controlador.
+
+    `timeout` es el tiempo máximo total de la descarga, no solo por operación
+    de socket: un controlador que envía datos muy lentamente se corta igual,
+    así el thread que hace la descarga nunca queda colgado.
+    """
+    deadline = time.monotonic() + timeout
+    chunks = []
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        while True:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"La descarga de {url} superó {timeout}s")
+            chunk = response.read1(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        # read1 no avisa si la conexión se corta antes de Content-Length
+        if response.length:
+            raise http.client.IncompleteRead(b"".join(chunks), response.length)
+    return b"".join(chunks)
+
+
+def controller_dirnames(endpoints) -> dict:
+    """
+    Nombre de carpeta (dentro de out_dir) para cada controlador.
+
+    Se reemplazan los caracteres no seguros y se quitan los puntos iniciales
+    (así '..' no puede salir de out_dir). Si el nombre queda vacío, o si dos
+    controladores quedan con la misma carpeta, se agrega un hash del nombre
+    original para que no se pisen los archivos.
+    """
+    dirnames = {}
+    for name in endpoints:
+        dirnames[name] = re.sub(r"[^\w.-]+", "_", name).lstrip(".")
+
+    taken = list(dirnames.values())
+    for name, dirname in dirnames.items():
+        if not dirname or taken.count(dirname) > 1:
+            digest = hashlib.sha1(name.encode("utf-8")).hexdigest()[:10]
+            dirnames[name] = f"{dirname}_{digest}" if dirname else f"controlador_{digest}"
+    return dirnames
+
+
+def save_payload(out_dir: str, dirname: str, filename: str, payload: bytes) -> str:
+    """
+    Guarda el contenido crudo en out_dir/dirname/filename y retorna la ruta.
+    Falla si la ruta resultante queda fuera de out_dir.
+    """
+    base = os.path.realpath(out_dir)
+    controller_dir = os.path.realpath(os.path.join(base, dirname))
+    if os.path.commonpath([base, controller_dir]) != base or controller_dir == base:
+        raise ValueError(f"La carpeta {dirname!r} queda fuera de {out_dir!r}")
+    os.makedirs(controller_dir, exist_ok=True)
+    path = os.path.join(controller_dir, filename)
+    with open(path, "wb") as f:
+        f.write(payload)
+    return path
+
+
+def parse_payload(payload: bytes) -> dict:
+    """
+    Decodifica y procesa un diagnóstico descargado. Se ejecuta en el pool de
+    procesos, por eso vive a nivel de módulo (debe poder serializarse).
+    """
+    content = payload.decode("utf-8", errors="ignore")
+    return parse_diagnostic_file(content)
+
+
+async def fetch_with_retry(url, fetch_executor, timeout=10.0, retries=2, backoff=1.0) -> bytes:
+    """
+    Descarga un diagnóstico en el pool de threads `fetch_executor`, cuyo
+    tamaño limita la cantidad de descargas simultáneas.
+
+    Si falla (error de red, timeout, conexión cortada o error 5xx) se
+    reintenta hasta `retries` veces, esperando backoff, 2*backoff, 4*backoff... segundos entre intentos.
+    Los errores 4xx (URL o credenciales incorrectas) no se reintentan.
+    """
+    loop = asyncio.get_running_loop()
+    last_error = None
+    for attempt in range(retries + 1):
+        try:
+            return await loop.run_in_executor(fetch_executor, fetch_diagnostic, url, timeout)
+        except urllib.error.HTTPError as e:
+            if 400 <= e.code < 500:
+                raise
+            e.close()
+            last_error = e
+        except (OSError, http.client.HTTPException) as e:
+            last_error = e
+        if attempt < retries:
+            await asyncio.sleep(backoff * (2 ** attempt))
+    raise last_error
+
+
+async def ingest_controllers(endpoints, max_concurrency=8, timeout=10.0, retries=2,
+                             backoff=1.0, executor=None, when=None, out_dir=None) -> dict:
+    """
+    Descarga en paralelo los diagnósticos de varios controladores y los
+    procesa en un pool de workers.
+
+    - endpoints: dict {nombre_controlador: url} o lista de URLs (se usa la URL como nombre).
+    - max_concurrency: cantidad máxima de descargas simultáneas.
+    - executor: pool donde se ejecuta parse_payload (None => pool por defecto del loop).
+    - when: momento de la ingesta; si es None se usa la hora actual. La Hora se calcula con snapshot_time.
+    - out_dir: si se indica, guarda el contenido crudo en out_dir/<controlador>/<fecha>_<hora>.txt
+      (ej: 2026-10-19_11.txt) para poder subirlo después en app.py. La carpeta
+      de cada controlador se obtiene con controller_dirnames.
+
+    Devuelve los mismos DataFrames que parse_multiple_files (con una columna
+    extra 'controlador') y una lista 'errores' con los problemas encontrados.
+    Cada error indica la etapa: 'descarga', 'guardado' o 'parseo'. Un error de
+    guardado no descarta el diagnóstico, que se procesa igual.
+    """
+    if not isinstance(endpoints, dict):
+        endpoints = {url: url for url in endpoints}
+    snapshot = snapshot_time(when if when is not None else datetime.datetime.now())
+    hour = snapshot.hour
+    filename = f"{snapshot:%Y-%m-%d}_{hour}.txt"
+    dirnames = controller_dirnames(endpoints)
+
+    loop = asyncio.get_running_loop()
+    errores = []
+
+    async def process(name, url, fetch_executor):
+        try:
+            payload = await fetch_with_retry(url, fetch_executor, timeout, retries, backoff)
+        except Exception as e:
+            errores.append({"controlador": name, "url": url, "etapa": "descarga", "error": repr(e)})
+            return None
+
+        if out_dir is not None:
+            try:
+                await loop.run_in_executor(None, save_payload, out_dir, dirnames[name], filename, payload)
+            except Exception as e:
+                errores.append({"controlador": name, "url": url, "etapa": "guardado", "error": repr(e)})
+
+        try:
+            parsed = await loop.run_in_executor(executor, parse_payload, payload)
+        except Exception as e:
+            errores.append({"controlador": name, "url": url, "etapa": "parseo", "error": repr(e)})
+            return None
+        for df in parsed.values():
+            df["controlador"] = name
+        return parsed
+
+    # Pool exclusivo para las descargas: su tamaño es el límite de concurrencia
+    with ThreadPoolExecutor(max_workers=max_concurrency) as fetch_executor:
+        results = await asyncio.gather(
+            *(process(name, url, fetch_executor) for name, url in endpoints.items())
+        )
+
+    parsed_items = [(hour, snapshot.date(), parsed) for parsed in results if parsed is not None]
+    data_dict = combine_parsed_files(parsed_items)
+    data_dict["errores"] = errores
+    return data_dict
+
+
+def run_ingestion(endpoints, max_workers=None, **kwargs) -> dict:
+    """
+    Versión síncrona de ingest_controllers que crea su propio pool de procesos.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return asyncio.run(ingest_controllers(endpoints, executor=executor, **kwargs))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Descarga en paralelo los diagnósticos de varios controladores."
+    )
+    arg_parser.add_argument(
+        "endpoints", nargs="*", default=[DEFAULT_URL],
+        help="URLs de diagnóstico, opcionalmente como nombre=url (ej. OXIDOS=http://...)."
+    )
+    arg_parser.add_argument("--concurrency", type=int, default=8, help="Descargas simultáneas.")
+    arg_parser.add_argument("--timeout", type=float, default=10.0, help="Timeout por intento (s).")
+    arg_parser.add_argument("--retries", type=int, default=2, help="Reintentos por controlador.")
+    arg_parser.add_argument("--backoff", type=float, default=1.0, help="Espera base entre reintentos (s).")
+    arg_parser.add_argument("--workers", type=int, default=None, help="Procesos para el parseo.")
+    arg_parser.add_argument("--out-dir", default=None, help="Carpeta donde guardar los .txt descargados.")
+    args = arg_parser.parse_args()
+
+    endpoints = {}
+    for item in args.endpoints:
+        name, sep, url = item.partition("=")
+        if sep and not name.startswith(("http://", "https://")):
+            endpoints[name] = url
+        else:
+            endpoints[item] = item
+
+    data_dict = run_ingestion(
+        endpoints,
+        max_workers=args.workers,
+        max_concurrency=args.concurrency,
+        timeout=args.timeout,
+        retries=args.retries,
+        backoff=args.backoff,
+        out_dir=args.out_dir
+    )
+
+    print(f"Controladores OK: {len(endpoints) - len(data_dict['errores'])}/{len(endpoints)}")
+    print(f"Canales: {len(data_dict['channels_df'])}")
+    print(f"Registros: {len(data_dict['registrations_df'])}")
+    print(f"Afiliaciones TG: {len(data_dict['tgs_affiliations_df'])}")
+    for error in data_dict["errores"]:
+        print(f"Error de {error['etapa']} en {error['controlador']} ({error['url']}): {error['error']}")
+
+
+if __name__ == "__main__":
+    main()
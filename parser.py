@@ -124,6 +124,40 @@ def parse_multiple_files(uploaded_files) -> dict:
     - 'tg_id' -> 'grupo_num' y 'grupo' (en tgs_affiliations_df)
     - 'target_id' se mantiene para topología
     - Extra: asignar "Hora" en base al nombre del archivo (ej: '10.txt' => hora=10).
+    - Si el nombre incluye la fecha (ej: '2026-10-19_10.txt') se asigna además
+      "FechaHora", necesaria para mezclar archivos de distintos días.
+    """
+    # Regex para extraer el número de hora del nombre de archivo, ejemplo "10.txt" => 10
+    hour_pattern = re.compile(r"(\d+)\.txt$", re.IGNORECASE)
+    # Fecha opcional antes de la hora, ejemplo "2026-10-19_10.txt"
+    date_pattern = re.compile(r"(\d{4}-\d{2}-\d{2})[_ ]\d+\.txt$", re.IGNORECASE)
+
+    parsed_items = []
+    for uploaded_file in uploaded_files:
+        filename = uploaded_file.name  # nombre: ej. "10.txt"
+        match_hour = hour_pattern.search(filename)
+        hour_value = None
+        if match_hour:
+            hour_value = int(match_hour.group(1))
+        match_date = date_pattern.search(filename)
+        date_value = None
+        if match_date:
+            date_value = match_date.group(1)
+
+        content = uploaded_file.read().decode("utf-8", errors="ignore")
+        parsed_items.append((hour_value, date_value, parse_diagnostic_file(content)))
+
+    return combine_parsed_files(parsed_items)
+
+
+def combine_parsed_files(parsed_items) -> dict:
+    """
+    Combina los resultados de parse_diagnostic_file y aplica el renombre y
+    mapeo descrito en parse_multiple_files.
+
+    parsed_items es una lista de tuplas (hora, fecha, parsed), donde hora y
+    fecha pueden ser None si no se pudieron determinar. Se usa tanto para los archivos subidos
+    como para la ingesta directa desde los controladores (ver ingest.py).
     """
     all_channels = []
     all_regs = []
@@ -197,22 +231,16 @@ def parse_multiple_files(uploaded_files) -> dict:
     999: 'DESCONOCIDO'
 }
 
-    # Regex para extraer el número de hora del nombre de archivo, ejemplo "10.txt" => 10
-    hour_pattern = re.compile(r"(\d+)\.txt$", re.IGNORECASE)
-
-    for uploaded_file in uploaded_files:
-        filename = uploaded_file.name  # nombre: ej. "10.txt"
-        match_hour = hour_pattern.search(filename)
-        hour_value = None
-        if match_hour:
-            hour_value = int(match_hour.group(1))
-
-        content = uploaded_file.read().decode("utf-8", errors="ignore")
-        parsed = parse_diagnostic_file(content)
-
-        # Si encontramos hora, la asignamos en registrations_df como nueva columna
+    for hour_value, date_value, parsed in parsed_items:
+        # Si encontramos hora, la asignamos en registrations_df y tgs_affiliations_df como nueva columna
         if hour_value is not None:
             parsed["registrations_df"]["Hora"] = hour_value
+            parsed["tgs_affiliations_df"]["Hora"] = hour_value
+            # Con fecha, además un instante real (la Hora sola se repite cada día)
+            if date_value is not None:
+                fecha_hora = pd.Timestamp(date_value) + pd.Timedelta(hours=hour_value)
+                parsed["registrations_df"]["FechaHora"] = fecha_hora
+                parsed["tgs_affiliations_df"]["FechaHora"] = fecha_hora
 
         all_channels.append(parsed["channels_df"])
         all_regs.append(parsed["registrations_df"])
@@ -0,0 +1,140 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomalies import build_series_matrix, detect_anomalies, detect_matrix_anomalies, rolling_baseline, time_column
+from parser import parse_multiple_files
+
+
+class UploadedFile(io.BytesIO):
+    """Imita el objeto que entrega st.file_uploader (tiene .name y .read())."""
+
+    def __init__(self, name, content):
+        super().__init__(content.encode("utf-8"))
+        self.name = name
+
+
+def diagnostic(n_radios, aff_count=10):
+    lines = [
+        f"source:{i} username: radio{i} siteID:2 TGList:201 active:true x timestamp:1"
+        for i in range(n_radios)
+    ]
+    lines.append(f"TG:201 has 1 dyn affiliated sites: 2:{aff_count}")
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("window", [1, 3, 6])
+def test_rolling_baseline_matches_pandas(window):
+    rng = np.random.default_rng(0)
+    values = rng.poisson(20, size=(5, 40)).astype(float)
+
+    mean, std, count = rolling_baseline(values, window)
+
+    frame = pd.DataFrame(values.T)
+    expected_mean = frame.rolling(window, min_periods=1).mean().shift(1).to_numpy().T
+    expected_std = frame.rolling(window, min_periods=1).std(ddof=0).shift(1).to_numpy().T
+    np.testing.assert_allclose(mean, expected_mean, equal_nan=True)
+    np.testing.assert_allclose(std, expected_std, atol=1e-6, equal_nan=True)
+    assert list(count[:window + 2]) == [min(t, window) for t in range(window + 2)]
+
+
+def test_missing_site_hour_is_zero_filled_and_flagged():
+    rows = [{"sitio": "OXE", "Hora": h} for h in range(6) for _ in range(10)]
+    rows += [{"sitio": "OXIDOS", "Hora": h} for h in range(5) for _ in range(10)]
+    matrix = build_series_matrix(pd.DataFrame(rows), "sitio")
+
+    assert matrix.loc["OXIDOS", 5] == 0
+    alerts = detect_matrix_anomalies(matrix, "sitio")
+    assert list(zip(alerts["serie"], alerts["Hora"])) == [("OXIDOS", 5)]
+
+
+def test_min_periods_gate():
+    matrix = pd.DataFrame([[10, 10, 2, 10, 2]], index=["OXE"], columns=range(5))
+
+    alerts = detect_matrix_anomalies(matrix, "sitio", min_periods=3)
+    assert list(alerts["Hora"]) == [4]
+
+    # Una ventana más chica que min_periods no debe apagar la detección
+    alerts = detect_matrix_anomalies(matrix, "sitio", window=2, min_periods=3)
+    assert list(alerts["Hora"]) == [2, 4]
+
+
+def test_min_baseline_gate():
+    matrix = pd.DataFrame([[4, 4, 4, 4, 1], [40, 40, 40, 40, 10]], index=["OXE", "ES"], columns=range(5))
+
+    alerts = detect_matrix_anomalies(matrix, "sitio", min_baseline=5)
+    assert list(alerts["serie"]) == ["ES"]
+
+    alerts = detect_matrix_anomalies(matrix, "sitio", min_baseline=0)
+    assert sorted(alerts["serie"]) == ["ES", "OXE"]
+
+
+def test_partial_second_day_is_not_a_drop():
+    files = [UploadedFile(f"2026-10-19_{h}.txt", diagnostic(10)) for h in range(8, 13)]
+    files += [UploadedFile(f"2026-10-20_{h}.txt", diagnostic(10)) for h in range(8, 11)]
+    data = parse_multiple_files(files)
+
+    assert time_column(data["registrations_df"], data["tgs_affiliations_df"]) == "FechaHora"
+    assert detect_anomalies(data["registrations_df"], data["tgs_affiliations_df"]).empty
+
+
+def test_baseline_crosses_midnight():
+    files = [
+        UploadedFile("2026-10-19_21.txt", diagnostic(10)),
+        UploadedFile("2026-10-19_22.txt", diagnostic(10)),
+        UploadedFile("2026-10-19_23.txt", diagnostic(10)),
+        UploadedFile("2026-10-20_0.txt", diagnostic(10)),
+        UploadedFile("2026-10-20_1.txt", diagnostic(2, aff_count=2)),
+    ]
+    data = parse_multiple_files(files)
+    alerts = detect_anomalies(data["registrations_df"], data["tgs_affiliations_df"])
+
+    assert set(alerts["tipo"]) == {"sitio", "grupo", "afiliacion"}
+    assert set(alerts["FechaHora"]) == {pd.Timestamp("2026-10-20 01:00")}
+    assert set(alerts["Hora"]) == {1}
+
+
+def test_files_without_date_fall_back_to_hour_of_day():
+    files = [UploadedFile(f"{h}.txt", diagnostic(10)) for h in range(8, 12)]
+    files.append(UploadedFile("12.txt", diagnostic(2)))
+    data = parse_multiple_files(files)
+
+    assert time_column(data["registrations_df"], data["tgs_affiliations_df"]) == "Hora"
+    alerts = detect_anomalies(data["registrations_df"], data["tgs_affiliations_df"])
+    assert set(alerts["Hora"]) == {12}
+    assert alerts["FechaHora"].isna().all()
+
+
+def test_site_series_matches_chart_1_counts():
+    # Cada radio está en dos grupos: el gráfico 1 cuenta una fila por radio y grupo
+    files = [UploadedFile(f"2026-10-19_{h}.txt", diagnostic(10).replace("TGList:201", "TGList:201,202"))
+             for h in range(8, 12)]
+    files.append(UploadedFile("2026-10-19_12.txt", diagnostic(2).replace("TGList:201", "TGList:201,202")))
+    data = parse_multiple_files(files)
+    regs = data["registrations_df"]
+
+    chart_counts = regs.groupby(["FechaHora", "sitio"]).size()
+    alerts = detect_anomalies(regs, data["tgs_affiliations_df"])
+    site_alert = alerts[alerts["tipo"] == "sitio"].iloc[0]
+
+    assert site_alert["valor"] == chart_counts[(site_alert["FechaHora"], site_alert["serie"])] == 4
+    assert site_alert["baseline"] == 20
+
+
+def test_hundreds_of_tgs_over_weeks():
+    rng = np.random.default_rng(1)
+    n_tgs, n_hours = 500, 24 * 21
+    hours = pd.date_range("2026-10-01", periods=n_hours, freq="h")
+    affiliations = pd.DataFrame({
+        "grupo_num": np.tile(np.arange(1000, 1000 + n_tgs), n_hours),
+        "FechaHora": np.repeat(hours, n_tgs),
+        "aff_count": rng.poisson(40, size=n_tgs * n_hours),
+    })
+    affiliations["grupo"] = affiliations["grupo_num"].astype(str)
+    affiliations.loc[(affiliations["grupo_num"] == 1003) & (affiliations["FechaHora"] >= hours[300]), "aff_count"] = 0
+
+    alerts = detect_anomalies(pd.DataFrame(), affiliations)
+
+    assert pd.Timestamp(hours[300]) in set(alerts.loc[alerts["serie"] == "1003", "FechaHora"])
@@ -0,0 +1,205 @@
+import asyncio
+import datetime
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ingest import controller_dirnames, ingest_controllers, snapshot_time
+
+DIAGNOSTIC = b"""Site ID: 2
+Channel 1 Logical: 3 SourceID: 7001 TargetID: 201 CallType:Group Status: Busy Allocated Time: 12
+source:7001 username: radio1 siteID:2 TGList:201,202 active:true x timestamp:123
+TG:201 has 2 dyn affiliated sites: 1:4 2:6
+"""
+
+
+class StubController:
+    """
+    Servidor HTTP local que simula los controladores. Cuenta los requests
+    por ruta y el máximo de requests atendidos en paralelo.
+    """
+
+    def __init__(self):
+        self.hits = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub.lock:
+                    stub.hits[self.path] = stub.hits.get(self.path, 0) + 1
+                    hits = stub.hits[self.path]
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    stub.respond(self, hits)
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def respond(self, handler, hits):
+        path = handler.path
+        if path.startswith("/busy"):
+            time.sleep(0.2)
+        elif path == "/slow-once" and hits == 1:
+            time.sleep(1.0)
+        elif path == "/drip":
+            handler.send_response(200)
+            handler.end_headers()
+            for _ in range(30):
+                handler.wfile.write(b"x")
+                handler.wfile.flush()
+                time.sleep(0.1)
+            return
+        elif path == "/truncated-once" and hits == 1:
+            # Anuncia más bytes de los que envía y corta la conexión
+            handler.send_response(200)
+            handler.send_header("Content-Length", str(len(DIAGNOSTIC) + 100))
+            handler.end_headers()
+            handler.wfile.write(DIAGNOSTIC[:20])
+            handler.close_connection = True
+            return
+        elif path == "/error":
+            handler.send_response(500)
+            handler.end_headers()
+            return
+        elif path == "/missing":
+            handler.send_response(404)
+            handler.end_headers()
+            return
+        handler.send_response(200)
+        handler.end_headers()
+        handler.wfile.write(DIAGNOSTIC)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_address[1]}{path}"
+
+
+@pytest.fixture
+def stub():
+    controller = StubController()
+    controller.thread.start()
+    yield controller
+    controller.server.shutdown()
+    controller.server.server_close()
+
+
+def ingest(endpoints, **kwargs):
+    kwargs.setdefault("timeout", 0.5)
+    kwargs.setdefault("backoff", 0.01)
+    kwargs.setdefault("when", datetime.datetime(2026, 10, 19, 10, 55))
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        return asyncio.run(ingest_controllers(endpoints, executor=executor, **kwargs))
+
+
+def test_snapshot_time_rounds_to_nearest_hour():
+    assert snapshot_time(datetime.datetime(2026, 10, 19, 10, 55)) == datetime.datetime(2026, 10, 19, 11)
+    assert snapshot_time(datetime.datetime(2026, 10, 19, 10, 20)) == datetime.datetime(2026, 10, 19, 10)
+    assert snapshot_time(datetime.datetime(2026, 10, 19, 23, 40)) == datetime.datetime(2026, 10, 20, 0)
+
+
+def test_success(stub, tmp_path):
+    data = ingest({"OXIDOS": stub.url("/ok"), "OXE": stub.url("/ok")}, out_dir=str(tmp_path))
+
+    assert data["errores"] == []
+    regs = data["registrations_df"]
+    assert set(regs["controlador"]) == {"OXIDOS", "OXE"}
+    assert set(regs["Hora"]) == {11}
+    assert set(regs["sitio"]) == {"OXIDOS"}
+    assert len(data["tgs_affiliations_df"]) == 4
+    assert os.path.exists(tmp_path / "OXIDOS" / "2026-10-19_11.txt")
+
+
+def test_timeout_is_retried(stub):
+    data = ingest({"c1": stub.url("/slow-once")}, retries=1)
+
+    assert data["errores"] == []
+    assert stub.hits["/slow-once"] == 2
+    assert len(data["registrations_df"]) == 2
+
+
+def test_slow_drip_is_cut_at_timeout(stub):
+    start = time.monotonic()
+    data = ingest({"c1": stub.url("/drip")}, retries=0)
+
+    assert time.monotonic() - start < 2.0
+    assert [e["etapa"] for e in data["errores"]] == ["descarga"]
+    assert "TimeoutError" in data["errores"][0]["error"]
+
+
+def test_permanent_failure_goes_to_errores(stub):
+    data = ingest({"ok": stub.url("/ok"), "bad": stub.url("/error")}, retries=2)
+
+    assert stub.hits["/error"] == 3
+    assert data["errores"] == [{
+        "controlador": "bad",
+        "url": stub.url("/error"),
+        "etapa": "descarga",
+        "error": data["errores"][0]["error"],
+    }]
+    assert "500" in data["errores"][0]["error"]
+    assert set(data["registrations_df"]["controlador"]) == {"ok"}
+
+
+def test_client_errors_are_not_retried(stub):
+    data = ingest({"c1": stub.url("/missing")}, retries=2)
+
+    assert stub.hits["/missing"] == 1
+    assert len(data["errores"]) == 1
+    assert data["registrations_df"].empty
+
+
+def test_max_concurrency_is_respected(stub):
+    endpoints = {f"c{i}": stub.url(f"/busy{i}") for i in range(8)}
+    data = ingest(endpoints, max_concurrency=3)
+
+    assert data["errores"] == []
+    assert 1 < stub.max_in_flight <= 3
+    assert set(data["registrations_df"]["controlador"]) == set(endpoints)
+
+
+def test_truncated_body_is_retried(stub):
+    data = ingest({"c1": stub.url("/truncated-once")}, retries=1)
+
+    assert data["errores"] == []
+    assert stub.hits["/truncated-once"] == 2
+    assert len(data["registrations_df"]) == 2
+
+
+def test_save_failure_keeps_parsed_data(stub, tmp_path):
+    not_a_dir = tmp_path / "archivo"
+    not_a_dir.write_text("")
+    data = ingest({"c1": stub.url("/ok"), "c2": stub.url("/ok")}, out_dir=str(not_a_dir))
+
+    assert sorted(e["controlador"] for e in data["errores"]) == ["c1", "c2"]
+    assert {e["etapa"] for e in data["errores"]} == {"guardado"}
+    assert set(data["registrations_df"]["controlador"]) == {"c1", "c2"}
+
+
+def test_controller_names_stay_inside_out_dir(stub, tmp_path):
+    out_dir = tmp_path / "out"
+    data = ingest({"..": stub.url("/ok"), ".": stub.url("/ok")}, out_dir=str(out_dir))
+
+    assert data["errores"] == []
+    assert sorted(os.listdir(tmp_path)) == ["out"]
+    assert len(os.listdir(out_dir)) == 2
+
+
+def test_controller_dirnames_do_not_collide():
+    dirnames = controller_dirnames({"OX E": "u1", "OX/E": "u2", "OXIDOS": "u3", "..": "u4"})
+
+    assert dirnames["OXIDOS"] == "OXIDOS"
+    assert len(set(dirnames.values())) == 4
+    assert all(d and not d.startswith(".") for d in dirnames.values())